@@ -12,9 +12,11 @@ setup(
         "pytesseract>=0.3.10",
         "pdf2image>=1.16.3",
         "pyarrow>=12.0.1",
-        "s3fs>=2023.6.0",
     ],
     extras_require={
+        "native": [
+            "tesserocr>=2.6.0",
+        ],
         "dev": [
             "pytest>=7.3.1",
             "pytest-cov>=4.1.0",
@@ -1,14 +1,50 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+from botocore.exceptions import ClientError
 import pytesseract
 from pdf2image import convert_from_path
 from PIL import Image
 import pandas as pd
-from concurrent.futures import ThreadPoolExecutor
+import pyarrow as pa
+import pyarrow.parquet as pq
+import hashlib
+import io
 import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from config.settings import OCRConfig
+from .storage import get_s3_client
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+
+@lru_cache(maxsize=None)
+def _get_tesseract_api(psm: int):
+    # One tesseract API per process, created on first use; keeps the
+    # LSTM model resident instead of reloading it per invocation.
+    api = tesserocr.PyTessBaseAPI(lang='eng', psm=psm)
+    api.SetVariable("tessedit_do_invert", "0")
+    return api
 
 class DocumentProcessor:
-    def __init__(self, output_type: str = "both"):
+    def __init__(
+        self,
+        output_type: str = "both",
+        cache_bucket: Optional[str] = None,
+        cache_prefix: str = "cache",
+        config: Optional[OCRConfig] = None
+    ):
         self.output_type = output_type
+        self.config = config or OCRConfig()
+        self.cache_bucket = cache_bucket
+        self.cache_prefix = cache_prefix
+        # Tesseract's OpenMP threading anti-scales; keep every tesseract
+        # invocation single-threaded and scale with processes instead.
+        os.environ["OMP_THREAD_LIMIT"] = "1"
         self._validate_output_type()
     
     def _validate_output_type(self):
@@ -24,42 +60,207 @@ class DocumentProcessor:
         document_id: str
     ) -> Dict[str, Any]:
         """Process a single document for OCR."""
-        images = convert_from_path(file_path)
+        cached = self.cache_lookup(file_path)
+        if cached is not None:
+            if self.output_type in ("image", "both"):
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    cached["image_paths"] = self.export_page_images(
+                        file_path, document_id, tmp_dir
+                    )
+            return cached
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            result, page_paths = self.rasterize_document(
+                file_path, document_id, tmp_dir
+            )
+            if self.output_type in ("text", "both"):
+                result["text"] = self.extract_text_batch(page_paths)
+
+        self.cache_store(file_path, result)
+        return result
+
+    def export_page_images(
+        self,
+        file_path: str,
+        document_id: str,
+        output_dir: str
+    ) -> List[str]:
+        """Re-render a document and export its page PNGs.
+
+        Used on cache hits: cached rows carry only the text payload, so
+        image outputs are rematerialized on the current instance.
+        """
+        page_paths = self.rasterize(file_path, output_dir)
+        return self._save_images(page_paths, document_id)
+
+    def cache_lookup(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for this file content, if any."""
+        if not self.cache_bucket:
+            return None
+        try:
+            response = get_s3_client().get_object(
+                Bucket=self.cache_bucket,
+                Key=self._cache_key(file_path)
+            )
+        except ClientError:
+            return None
+        table = pq.read_table(io.BytesIO(response['Body'].read()))
+        return table.to_pylist()[0]
+
+    def cache_store(
+        self,
+        file_path: str,
+        result: Dict[str, Any]
+    ) -> None:
+        """Store a finished result keyed by the file's content hash."""
+        if not self.cache_bucket or "error" in result:
+            return
+        # Page PNGs are instance-local paths; cache only the
+        # reproducible text payload and metadata, and rematerialize
+        # images on hit.
+        cacheable = {
+            k: v for k, v in result.items() if k != "image_paths"
+        }
+        buf = io.BytesIO()
+        pq.write_table(pa.Table.from_pylist([cacheable]), buf)
+        get_s3_client().put_object(
+            Bucket=self.cache_bucket,
+            Key=self._cache_key(file_path),
+            Body=buf.getvalue()
+        )
+
+    def _cache_key(self, file_path: str) -> str:
+        with open(file_path, 'rb') as f:
+            digest = hashlib.blake2b(
+                f.read(), digest_size=16
+            ).hexdigest()
+        # Results depend on the OCR settings as much as on the input
+        # bytes, so bake them into the key: runs with different
+        # output types or segmentation/DPI settings must not share
+        # cached rows.
+        settings = (
+            f"{self.output_type}"
+            f"-psm{self.config.page_segmentation_mode}"
+            f"-dpi{self.config.fixed_dpi}"
+        )
+        return f"{self.cache_prefix}/{digest}-{settings}.parquet"
+
+    def rasterize_document(
+        self,
+        file_path: str,
+        document_id: str,
+        output_dir: str
+    ) -> Tuple[Dict[str, Any], List[str]]:
+        """Rasterize a document and build its result skeleton (no OCR)."""
+        page_paths = self.rasterize(file_path, output_dir)
         result = {
             "document_id": document_id,
             "filename": os.path.basename(file_path),
-            "page_count": len(images),
+            "page_count": len(page_paths),
             "processed_at": pd.Timestamp.now(),
             "ocr_tool": f"tesseract-{pytesseract.__version__}"
         }
-        
-        if self.output_type in ("text", "both"):
-            result["text"] = self._extract_text(images)
-            
+
         if self.output_type in ("image", "both"):
             result["image_paths"] = self._save_images(
-                images, document_id
+                page_paths, document_id
             )
-            
-        return result
-    
-    def _extract_text(self, images: List[Image.Image]) -> List[str]:
-        """Extract text from images using Tesseract."""
-        with ThreadPoolExecutor() as executor:
-            texts = list(executor.map(
-                pytesseract.image_to_string, images
-            ))
-        return texts
-    
+
+        return result, page_paths
+
+    def rasterize(self, file_path: str, output_dir: str) -> List[str]:
+        """Rasterize a PDF into per-page TIFF files."""
+        return convert_from_path(
+            file_path,
+            dpi=self.config.fixed_dpi,
+            thread_count=os.cpu_count(),
+            output_folder=output_dir,
+            fmt="tiff",
+            grayscale=True,
+            paths_only=True,
+            use_pdftocairo=True,
+        )
+
+    def extract_text_batch(self, page_paths: List[str]) -> List[str]:
+        """Extract text from page images without per-page tesseract init.
+
+        Uses the resident tesserocr API when available, otherwise falls
+        back to a single batched subprocess call over an imagelist file.
+        """
+        if not page_paths:
+            return []
+        os.environ["OMP_THREAD_LIMIT"] = "1"
+
+        if tesserocr is not None:
+            api = _get_tesseract_api(
+                self.config.page_segmentation_mode
+            )
+            texts = []
+            for page_path in page_paths:
+                api.SetImageFile(page_path)
+                texts.append(api.GetUTF8Text())
+            return texts
+
+        with tempfile.NamedTemporaryFile(
+            mode="w", suffix=".txt", delete=False
+        ) as list_file:
+            list_file.write("\n".join(page_paths))
+            list_path = list_file.name
+        try:
+            output = pytesseract.image_to_string(
+                list_path,
+                config=(
+                    f"--psm {self.config.page_segmentation_mode} "
+                    f"--dpi {self.config.fixed_dpi} "
+                    "-c tessedit_do_invert=0"
+                )
+            )
+        finally:
+            os.unlink(list_path)
+
+        texts = output.split("\f")
+        if len(texts) < len(page_paths):
+            texts.extend([""] * (len(page_paths) - len(texts)))
+        return texts[:len(page_paths)]
+
     def _save_images(
         self,
-        images: List[Image.Image],
+        page_paths: List[str],
         document_id: str
     ) -> List[str]:
-        """Save images as PNG files."""
-        paths = []
-        for idx, image in enumerate(images):
-            path = f"output/{document_id}_page_{idx+1}.png"
-            image.save(path, "PNG")
-            paths.append(path)
+        """Save page images as PNG files."""
+        if not page_paths:
+            return []
+
+        prefix = f"output/{document_id}_page_"
+        paths = [
+            f"{prefix}{idx + 1}.png"
+            for idx in range(len(page_paths))
+        ]
+
+        def _encode(page_path: str) -> bytes:
+            buf = io.BytesIO()
+            # An 8-bit palette is enough for OCR-visible content and
+            # encodes several times faster (and smaller) than full RGB.
+            with Image.open(page_path) as image:
+                image.convert(
+                    "P", palette=Image.ADAPTIVE, colors=64
+                ).save(
+                    buf,
+                    "PNG",
+                    optimize=False,
+                    compress_level=self.config.png_compress_level,
+                )
+            return buf.getvalue()
+
+        # PIL releases the GIL during PNG encode, so encode all pages
+        # concurrently in memory, then flush to disk in one tight pass
+        # instead of interleaving encode and write syscalls per page.
+        with ThreadPoolExecutor(
+            max_workers=os.cpu_count()
+        ) as executor:
+            encoded = executor.map(_encode, page_paths)
+            for path, data in zip(paths, encoded):
+                with open(path, "wb") as f:
+                    f.write(data)
         return paths
@@ -1,50 +1,143 @@
-from typing import List, Optional
+from typing import Iterator, List, Optional, Union
+import io
 import boto3
-import s3fs
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from functools import lru_cache
 import pandas as pd
 import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import uuid
 
+from config.settings import OCRConfig
+
+# Below this total size, file-per-partition overhead (multipart init,
+# per-object PUTs, listing cost) outweighs partition pruning; write one
+# aggregated file with the partition key kept as a column instead.
+_SINGLE_FILE_THRESHOLD = 128 * 1024 * 1024
+
+
+@lru_cache(maxsize=None)
+def get_s3_client(region: Optional[str] = None):
+    """Return a shared S3 client with a tuned connection pool.
+
+    boto3 clients are thread-safe, and client construction pays
+    credential resolution and HTTPS pool setup, so one client per
+    region is built once and reused process-wide. 50 pool slots keep
+    concurrent partition uploads from starving on connections.
+    """
+    return boto3.client(
+        's3',
+        region_name=region,
+        config=Config(
+            max_pool_connections=50,
+            retries={'max_attempts': 10, 'mode': 'adaptive'},
+            tcp_keepalive=True,
+        ),
+    )
+
+
 class StorageManager:
-    def __init__(self, bucket: str, prefix: str):
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str,
+        config: Optional[OCRConfig] = None
+    ):
         self.bucket = bucket
         self.prefix = prefix
-        self.s3_client = boto3.client('s3')
-        self.s3fs = s3fs.S3FileSystem()
+        self.config = config or OCRConfig()
+        self.s3_client = get_s3_client()
     
-    def list_documents(self, extension: str = ".pdf") -> List[str]:
-        """List all documents with given extension in the bucket/prefix."""
-        response = self.s3_client.list_objects_v2(
+    def list_documents(self, extension: str = ".pdf") -> Iterator[str]:
+        """Yield all documents with given extension in the bucket/prefix."""
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        pages = paginator.paginate(
             Bucket=self.bucket,
-            Prefix=self.prefix
+            Prefix=self.prefix,
+            PaginationConfig={'PageSize': 1000}
         )
-        return [
-            obj['Key'] for obj in response.get('Contents', [])
-            if obj['Key'].endswith(extension)
-        ]
+        for page in pages:
+            for obj in page.get('Contents', ()):
+                if obj['Key'].endswith(extension):
+                    yield obj['Key']
     
     def save_results(
         self,
-        data: pd.DataFrame,
+        data: Union[pa.Table, pd.DataFrame],
         partition_key: str,
         output_prefix: str
     ) -> None:
         """Save results to S3 in partitioned parquet format."""
+        if isinstance(data, pd.DataFrame):
+            data = pa.Table.from_pandas(data, preserve_index=False)
+
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         file_id = uuid.uuid4().hex[:8]
         
-        for partition_value, partition_df in data.groupby(partition_key):
-            output_path = (
-                f"s3://{self.bucket}/{output_prefix}/"
+        # Partitions are small, so modest buffers (default 10 MiB, near
+        # the S3 multipart minimum) keep multipart submission from
+        # serializing on oversized parts.
+        buffer_bytes = self.config.s3_upload_buffer_mb * 1024 * 1024
+        transfer_config = TransferConfig(
+            multipart_threshold=buffer_bytes,
+            multipart_chunksize=buffer_bytes,
+            max_concurrency=16,
+            use_threads=True,
+        )
+
+        if data.nbytes < _SINGLE_FILE_THRESHOLD:
+            self._upload_table(
+                data,
+                f"{output_prefix}/batch_{timestamp}_{file_id}.parquet",
+                transfer_config,
+            )
+            return
+
+        def _upload_partition(partition_value) -> None:
+            key = (
+                f"{output_prefix}/"
                 f"{partition_key}={partition_value}/"
                 f"batch_{timestamp}_{file_id}.parquet"
             )
-            
-            table = pa.Table.from_pandas(
-                partition_df.drop(columns=[partition_key])
-            )
-            
-            with self.s3fs.open(output_path, 'wb') as f:
-                pq.write_table(table, f)
+
+            table = data.filter(
+                pc.equal(data[partition_key], partition_value)
+            ).drop([partition_key])
+
+            self._upload_table(table, key, transfer_config)
+
+        # The pool doubles as the semaphore bounding PUTs in flight.
+        partition_values = pc.unique(data[partition_key]).to_pylist()
+        max_workers = min(
+            self.config.s3_max_concurrency, len(partition_values)
+        ) or 1
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(_upload_partition, partition_values))
+
+    def _upload_table(
+        self,
+        table: pa.Table,
+        key: str,
+        transfer_config: TransferConfig
+    ) -> None:
+        # Buffer the whole file in memory with large pages and row
+        # groups so S3 sees one contiguous upload instead of many small
+        # eager page writes.
+        buf = io.BytesIO()
+        pq.write_table(
+            table,
+            buf,
+            row_group_size=1 << 20,
+            data_page_size=1 << 20,
+            write_batch_size=65536,
+            compression='zstd',
+            compression_level=3,
+        )
+        buf.seek(0)
+        self.s3_client.upload_fileobj(
+            buf, self.bucket, key, Config=transfer_config
+        )
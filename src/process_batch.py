@@ -0,0 +1,215 @@
+import argparse
+import multiprocessing
+import os
+import tempfile
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import pyarrow as pa
+
+from core.processor import DocumentProcessor
+from core.storage import StorageManager
+
+
+def _string_list_array(
+    values: List[Optional[List[str]]]
+) -> pa.ListArray:
+    """Build a list<string> array from flat values plus offsets.
+
+    One flat string array and an int32 offsets array avoid the
+    per-element re-encode that pa.array pays when inferring nested
+    lists of Python strings.
+    """
+    offsets: List[int] = [0]
+    flat: List[str] = []
+    for value in values:
+        if value is not None:
+            flat.extend(value)
+        offsets.append(len(flat))
+    return pa.ListArray.from_arrays(
+        pa.array(offsets, type=pa.int32()),
+        pa.array(flat, type=pa.string()),
+        mask=pa.array(
+            [value is None for value in values], type=pa.bool_()
+        ),
+    )
+
+
+def _build_table(
+    results: List[Dict[str, Any]], output_type: str
+) -> pa.Table:
+    """Assemble results column-wise into an arrow table.
+
+    Building arrays directly skips the pandas object-dtype detour and
+    its extra materialization pass.
+    """
+    columns = {
+        "document_id": pa.array(
+            [r["document_id"] for r in results], type=pa.string()
+        ),
+        "filename": pa.array(
+            [r.get("filename") for r in results], type=pa.string()
+        ),
+        "page_count": pa.array(
+            [r.get("page_count") for r in results], type=pa.int64()
+        ),
+        "processed_at": pa.array(
+            [r.get("processed_at") for r in results],
+            type=pa.timestamp("us"),
+        ),
+        "ocr_tool": pa.array(
+            [r.get("ocr_tool") for r in results], type=pa.string()
+        ),
+    }
+    if output_type in ("text", "both"):
+        columns["text"] = _string_list_array(
+            [r.get("text") for r in results]
+        )
+    if output_type in ("image", "both"):
+        columns["image_paths"] = _string_list_array(
+            [r.get("image_paths") for r in results]
+        )
+    errors = [r.get("error") for r in results]
+    if any(error is not None for error in errors):
+        columns["error"] = pa.array(errors, type=pa.string())
+    return pa.Table.from_pydict(columns)
+
+
+def _rasterize_one(
+    job: Tuple[str, str, str, str, Optional[str], Optional[str]]
+) -> Tuple[Dict[str, Any], List[str], bool]:
+    """Rasterize one document in a worker process (no OCR)."""
+    (
+        file_path,
+        document_id,
+        output_type,
+        pages_dir,
+        cache_bucket,
+        cache_prefix,
+    ) = job
+    processor = DocumentProcessor(
+        output_type=output_type,
+        cache_bucket=cache_bucket,
+        cache_prefix=cache_prefix or "cache",
+    )
+    try:
+        cached = processor.cache_lookup(file_path)
+        if cached is not None:
+            # Cached rows carry text only; page PNGs are re-exported
+            # so image_paths stay valid on this instance.
+            if output_type in ("image", "both"):
+                doc_dir = os.path.join(pages_dir, document_id)
+                os.makedirs(doc_dir, exist_ok=True)
+                cached["image_paths"] = processor.export_page_images(
+                    file_path, document_id, doc_dir
+                )
+            return cached, [], True
+
+        doc_dir = os.path.join(pages_dir, document_id)
+        os.makedirs(doc_dir, exist_ok=True)
+        result, page_paths = processor.rasterize_document(
+            file_path, document_id, doc_dir
+        )
+        return result, page_paths, False
+    except Exception as exc:
+        return {
+            "document_id": document_id,
+            "filename": os.path.basename(file_path),
+            "error": str(exc),
+        }, [], False
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Batch OCR processing job."
+    )
+    parser.add_argument(
+        "--input-dir", default="/opt/ml/processing/input"
+    )
+    parser.add_argument("--bucket", required=True)
+    parser.add_argument("--output-prefix", default="processed")
+    parser.add_argument("--output-type", default="both")
+    parser.add_argument(
+        "--cache-prefix",
+        default=None,
+        help=(
+            "S3 prefix for content-hash result caching; restarted jobs "
+            "skip documents already present under it."
+        ),
+    )
+    args = parser.parse_args()
+
+    documents = [
+        os.path.join(args.input_dir, name)
+        for name in sorted(os.listdir(args.input_dir))
+        if name.lower().endswith(".pdf")
+    ]
+    if not documents:
+        return
+
+    # Rasterization fans out across processes (poppler is CPU-bound and
+    # documents are independent); OCR then runs as one tesseract batch
+    # over every page in the job, paying model init once per job rather
+    # than once per document.
+    with tempfile.TemporaryDirectory() as pages_dir:
+        cache_bucket = args.bucket if args.cache_prefix else None
+        jobs = [
+            (
+                path,
+                os.path.splitext(os.path.basename(path))[0],
+                args.output_type,
+                pages_dir,
+                cache_bucket,
+                args.cache_prefix,
+            )
+            for path in documents
+        ]
+        with multiprocessing.Pool(
+            processes=min(os.cpu_count(), len(documents)),
+            maxtasksperchild=4,
+        ) as pool:
+            rasterized = pool.map(_rasterize_one, jobs)
+
+        if args.output_type in ("text", "both"):
+            all_pages: List[str] = []
+            owners: List[str] = []
+            for result, page_paths, from_cache in rasterized:
+                all_pages.extend(page_paths)
+                owners.extend(
+                    [result["document_id"]] * len(page_paths)
+                )
+
+            ocr = DocumentProcessor(output_type=args.output_type)
+            texts = ocr.extract_text_batch(all_pages)
+            texts_by_doc = defaultdict(list)
+            for document_id, text in zip(owners, texts):
+                texts_by_doc[document_id].append(text)
+
+            for result, _, from_cache in rasterized:
+                if "error" not in result and not from_cache:
+                    result["text"] = texts_by_doc.get(
+                        result["document_id"], []
+                    )
+
+        if cache_bucket:
+            processor = DocumentProcessor(
+                output_type=args.output_type,
+                cache_bucket=cache_bucket,
+                cache_prefix=args.cache_prefix,
+            )
+            for job, (result, _, from_cache) in zip(jobs, rasterized):
+                if not from_cache:
+                    processor.cache_store(job[0], result)
+
+    results = [result for result, _, _ in rasterized]
+
+    storage = StorageManager(args.bucket, args.output_prefix)
+    storage.save_results(
+        _build_table(results, args.output_type),
+        partition_key="document_id",
+        output_prefix=args.output_prefix,
+    )
+
+
+if __name__ == "__main__":
+    main()